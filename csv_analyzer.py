@@ -2,18 +2,80 @@
 CSV Analysis module for finding patterns and connections in data
 """
 
+import warnings
 import pandas as pd
 import numpy as np
-from scipy.stats import pearsonr, spearmanr
+from scipy.stats import pearsonr, spearmanr, rankdata
 from pathlib import Path
 from typing import Dict, List, Tuple, Any
 
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pacsv
+except ImportError:  # pyarrow is optional; fall back to pandas' parser
+    pa = None
+    pacsv = None
+
+def _pairwise_correlation(arr: np.ndarray) -> np.ndarray:
+    """Pearson correlation over the rows where both columns are present, like DataFrame.corr()"""
+    valid = ~np.isnan(arr)
+    V = valid.astype(np.float64)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # All-NaN columns
+        # Centre on each column's own mean first so the pairwise sums below don't cancel
+        X = np.where(valid, arr - np.nanmean(arr, axis=0), 0.0)
+    
+    # Per-pair sums as GEMMs against the validity mask; [i, j] covers rows where i and j are present
+    n = V.T @ V
+    sx = X.T @ V
+    sxx = (X * X).T @ V
+    sxy = X.T @ X
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = sxy - sx * sx.T / n
+        var = sxx - sx * sx / n
+        corr = cov / np.sqrt(var * var.T)
+    
+    # Undefined with fewer than two common rows or a column that is constant on them. For a
+    # constant column, sxx - sx**2 / n cancels to rounding noise proportional to eps * sxx
+    tol = 64 * np.finfo(np.float64).eps * sxx
+    undefined = (n < 2) | (var <= tol) | (var.T <= tol.T)
+    corr[undefined] = np.nan
+    return np.clip(corr, -1, 1, out=corr)
+
+def correlation_matrix(arr: np.ndarray) -> np.ndarray:
+    """Pearson correlation between the columns of a 2D array, with the GEMM done in float32"""
+    if np.isnan(arr).any():
+        return _pairwise_correlation(arr)
+    
+    if arr.shape[0] < 2:
+        return np.full((arr.shape[1], arr.shape[1]), np.nan)
+    
+    # Constant columns are detected on the raw values; their centred std is rounding noise, not 0
+    constant = np.ptp(arr, axis=0) == 0
+    
+    # Centre and scale in float64 (float32 would wipe out columns with a large offset), then
+    # run the single GEMM on a float32 copy of the standardized matrix
+    X = np.array(arr, dtype=np.float64, order='F')
+    X -= X.mean(axis=0)
+    std = np.sqrt(np.einsum('ij,ij->j', X, X) / X.shape[0])
+    np.divide(X, std, out=X, where=~constant)
+    X = X.astype(np.float32, order='F')
+    
+    # Return float64 like the NaN path, so callers never see a data-dependent dtype
+    corr = (X.T @ X).astype(np.float64) / X.shape[0]
+    corr[constant, :] = np.nan  # Correlation with a constant column is undefined
+    corr[:, constant] = np.nan
+    return np.clip(corr, -1, 1, out=corr)
+
 class CSVAnalyzer:
     def __init__(self, file_path: Path):
         self.file_path = file_path
         self.data = None
         self.numeric_columns = []
         self.categorical_columns = []
+        self._numeric_matrix = None
+        self._valid_mask = None
+        self._corr_cache: Dict[tuple, np.ndarray] = {}
         
     def load_data(self) -> pd.DataFrame:
         """Load CSV data and identify column types"""
@@ -22,7 +84,7 @@ class CSVAnalyzer:
             encodings = ['utf-8', 'latin-1', 'cp1252']
             for encoding in encodings:
                 try:
-                    self.data = pd.read_csv(self.file_path, encoding=encoding)
+                    self.data = self._read_csv(encoding)
                     break
                 except UnicodeDecodeError:
                     continue
@@ -34,54 +96,163 @@ class CSVAnalyzer:
             self.numeric_columns = self.data.select_dtypes(include=[np.number]).columns.tolist()
             self.categorical_columns = self.data.select_dtypes(include=['object']).columns.tolist()
             
+            # Cache numeric columns as one contiguous float64 matrix for the analysis routines
+            self._numeric_matrix = np.array(self.data[self.numeric_columns], dtype=np.float64, order='F')
+            self._valid_mask = ~np.isnan(self._numeric_matrix)
+            self._corr_cache = {}
+            
             return self.data
             
         except Exception as e:
             raise Exception(f"Error loading CSV file: {e}")
     
+    def _read_csv(self, encoding: str) -> pd.DataFrame:
+        """Read the CSV with pyarrow's columnar parser when available, else pandas"""
+        if pacsv is not None:
+            read_options = pacsv.ReadOptions(encoding='utf8' if encoding == 'utf-8' else encoding)
+            # Treat empty strings as missing, matching pd.read_csv
+            convert_options = pacsv.ConvertOptions(strings_can_be_null=True)
+            try:
+                table = pacsv.read_csv(str(self.file_path), read_options=read_options,
+                                       convert_options=convert_options)
+                # Arrow infers dates and times that pd.read_csv leaves as text; re-read those as strings
+                temporal = {field.name: pa.string() for field in table.schema
+                            if pa.types.is_temporal(field.type)}
+                if temporal:
+                    convert_options.column_types = temporal
+                    table = pacsv.read_csv(str(self.file_path), read_options=read_options,
+                                           convert_options=convert_options)
+            except pa.ArrowInvalid:
+                table = None  # Let pandas handle files arrow's parser rejects
+            
+            # Arrow keeps duplicate header names as-is; pandas mangles them to name.1, name.2, ...
+            if table is not None and len(set(table.column_names)) != table.num_columns:
+                table = None
+            
+            if table is not None:
+                # Arrow keeps undecodable text as binary columns instead of raising
+                if any(pa.types.is_binary(field.type) for field in table.schema):
+                    raise UnicodeDecodeError(encoding, b'', 0, 1, 'invalid bytes in text column')
+                # All-empty columns are inferred as null type; pandas reads them as float64 NaN
+                # (a header-only file stays object-typed, as it does in pandas)
+                if table.num_rows > 0:
+                    table = table.cast(pa.schema([
+                        field.with_type(pa.float64()) if pa.types.is_null(field.type) else field
+                        for field in table.schema
+                    ]))
+                return table.to_pandas()
+        
+        return pd.read_csv(self.file_path, encoding=encoding)
+    
     def get_summary(self) -> Dict[str, Any]:
         """Get basic summary statistics"""
         if self.data is None:
             raise ValueError("Data not loaded. Call load_data() first.")
         
+        # Numeric columns reuse the cached NaN mask; only the remaining columns go through pandas
+        numeric_missing = dict(zip(self.numeric_columns, (~self._valid_mask).sum(axis=0).tolist()))
+        missing_values = {
+            col: numeric_missing[col] if col in numeric_missing else int(self.data[col].isna().sum())
+            for col in self.data.columns
+        }
+        
         summary = {
             'shape': self.data.shape,
             'columns': list(self.data.columns),
             'numeric_columns': self.numeric_columns,
             'categorical_columns': self.categorical_columns,
-            'missing_values': self.data.isnull().sum().to_dict(),
-            'basic_stats': self.data.describe().to_dict() if self.numeric_columns else {}
+            'missing_values': missing_values,
+            'basic_stats': self._basic_stats()
         }
         
         return summary
     
-    def find_connections(self) -> List[Dict[str, Any]]:
+    def get_correlation_matrix(self, method: str = 'pearson') -> np.ndarray:
+        """Correlation matrix of the numeric columns, computed once per method"""
+        if self.data is None:
+            raise ValueError("Data not loaded. Call load_data() first.")
+        if method not in ('pearson', 'spearman'):
+            raise ValueError(f"Unsupported correlation method '{method}'")
+        
+        key = (method, self.data.shape, tuple(self.numeric_columns))
+        if key not in self._corr_cache:
+            arr = self._numeric_matrix
+            if method == 'pearson':
+                self._corr_cache[key] = correlation_matrix(arr)
+            elif self._valid_mask.all():
+                # Spearman is pearson on ranks: rank every column once, then reuse the BLAS path
+                self._corr_cache[key] = correlation_matrix(rankdata(arr, axis=0))
+            else:
+                # With NaNs each pair must be re-ranked over its own common rows; pandas does that
+                self._corr_cache[key] = self.data[self.numeric_columns].corr(method='spearman').to_numpy()
+        
+        return self._corr_cache[key]
+    
+    def get_column_pair(self, column1: str, column2: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Values of two numeric columns restricted to rows where both are present"""
+        i = self.numeric_columns.index(column1)
+        j = self.numeric_columns.index(column2)
+        mask = self._valid_mask[:, i] & self._valid_mask[:, j]
+        return self._numeric_matrix[mask, i], self._numeric_matrix[mask, j]
+    
+    def _basic_stats(self) -> Dict[str, Dict[str, float]]:
+        """Count/mean/std/min/max per numeric column from the cached matrix (no quantile sorts)"""
+        if not self.numeric_columns:
+            return {}
+        
+        M = self._numeric_matrix
+        with warnings.catch_warnings():
+            # All-NaN columns yield NaN stats, as describe() does
+            warnings.simplefilter('ignore', RuntimeWarning)
+            stats = {
+                'count': self._valid_mask.sum(axis=0),
+                'mean': np.nanmean(M, axis=0),
+                'std': np.nanstd(M, axis=0, ddof=1),
+                'min': np.nanmin(M, axis=0),
+                'max': np.nanmax(M, axis=0),
+            }
+        
+        return {
+            col: {name: float(values[i]) for name, values in stats.items()}
+            for i, col in enumerate(self.numeric_columns)
+        }
+    
+    def find_connections(self, method: str = 'pearson') -> List[Dict[str, Any]]:
         """Find statistical connections between columns"""
+        if method not in ('pearson', 'spearman'):
+            raise ValueError(f"Unsupported correlation method '{method}'")
+        
         connections = []
         
         # Numeric correlations
         if len(self.numeric_columns) > 1:
-            corr_matrix = self.data[self.numeric_columns].corr()
+            corr_matrix = self.get_correlation_matrix(method)
             
-            for i, col1 in enumerate(self.numeric_columns):
-                for j, col2 in enumerate(self.numeric_columns[i+1:], i+1):
-                    correlation = corr_matrix.loc[col1, col2]
-                    
-                    if abs(correlation) > 0.3:  # Threshold for significant correlation
-                        connections.append({
-                            'type': 'correlation',
-                            'column1': col1,
-                            'column2': col2,
-                            'strength': abs(correlation),
-                            'direction': 'positive' if correlation > 0 else 'negative',
-                            'value': correlation
-                        })
+            # Threshold the upper triangle in one pass, then visit only surviving pairs
+            rows, cols = np.triu_indices(len(self.numeric_columns), k=1)
+            values = corr_matrix[rows, cols]
+            keep = np.abs(values) > 0.3  # Threshold for significant correlation
+            
+            for i, j, correlation in zip(rows[keep], cols[keep], values[keep]):
+                connections.append({
+                    'type': 'correlation',
+                    'column1': self.numeric_columns[i],
+                    'column2': self.numeric_columns[j],
+                    'strength': abs(correlation),
+                    'direction': 'positive' if correlation > 0 else 'negative',
+                    'value': correlation
+                })
         
         # Categorical associations (basic frequency analysis)
         for cat_col in self.categorical_columns:
+            if not self.numeric_columns:
+                break
+            # One groupby per categorical column covers every numeric column
+            all_grouped = self.data.groupby(cat_col, observed=True, sort=False)[self.numeric_columns] \
+                .agg(['mean', 'std', 'count'])
             for num_col in self.numeric_columns:
                 # Check if categorical variable affects numeric variable
-                grouped = self.data.groupby(cat_col)[num_col].agg(['mean', 'std', 'count'])
+                grouped = all_grouped[num_col]
                 if len(grouped) > 1:  # More than one category
                     variance_ratio = grouped['std'].max() / (grouped['std'].min() + 1e-10)
                     if variance_ratio > 2:  # Significant difference in variance
@@ -100,18 +271,33 @@ class CSVAnalyzer:
         if column not in self.numeric_columns:
             raise ValueError(f"Column '{column}' is not numeric")
         
-        data_col = self.data[column].dropna()
+        col = self._numeric_matrix[:, self.numeric_columns.index(column)]
+        valid = ~np.isnan(col)
+        values = col[valid]
+        index = self.data.index[valid]
+        
+        if values.size == 0:
+            return pd.Series(values, index=index, name=column)
         
         if method == 'iqr':
-            Q1 = data_col.quantile(0.25)
-            Q3 = data_col.quantile(0.75)
+            # Linearly interpolated quartiles via O(n) selection instead of a full sort
+            pos = np.array([0.25, 0.75]) * (values.size - 1)
+            lo = np.floor(pos).astype(int)
+            hi = np.minimum(lo + 1, values.size - 1)
+            part = np.partition(values, np.unique(np.concatenate([lo, hi])))
+            Q1, Q3 = part[lo] + (part[hi] - part[lo]) * (pos - lo)
             IQR = Q3 - Q1
             lower_bound = Q1 - 1.5 * IQR
             upper_bound = Q3 + 1.5 * IQR
-            return data_col[(data_col < lower_bound) | (data_col > upper_bound)]
+            mask = (values < lower_bound) | (values > upper_bound)
+            return pd.Series(values[mask], index=index[mask], name=column)
         
         elif method == 'zscore':
-            z_scores = np.abs((data_col - data_col.mean()) / data_col.std())
-            return data_col[z_scores > 3]
+            if values.size < 2:  # Sample std is undefined; pandas yields no outliers here
+                return pd.Series(values[:0], index=index[:0], name=column)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                z_scores = np.abs((values - values.mean()) / values.std(ddof=1))
+            mask = z_scores > 3
+            return pd.Series(values[mask], index=index[mask], name=column)
         
         return pd.Series()
\ No newline at end of file
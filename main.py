@@ -8,7 +8,6 @@ import argparse
 import sys
 from pathlib import Path
 from csv_analyzer import CSVAnalyzer
-from visualizer import Visualizer
 
 def main():
     parser = argparse.ArgumentParser(description='Analyze and visualize CSV files')
@@ -16,6 +15,7 @@ def main():
     parser.add_argument('--output', '-o', help='Output directory for visualizations', default='output')
     parser.add_argument('--connections', '-c', action='store_true', help='Find connections in data')
     parser.add_argument('--visualize', '-v', action='store_true', help='Generate visualizations')
+    parser.add_argument('--method', choices=['pearson', 'spearman'], default='pearson', help='Correlation method')
     parser.add_argument('--format', choices=['png', 'html', 'both'], default='both', help='Output format')
     
     args = parser.parse_args()
@@ -28,7 +28,11 @@ def main():
     
     # Initialize analyzer and visualizer
     analyzer = CSVAnalyzer(csv_file)
-    visualizer = Visualizer(output_dir=args.output)
+    visualizer = None
+    if args.visualize:
+        # Deferred: the plotting stack is slow to import and only needed with --visualize
+        from visualizer import Visualizer
+        visualizer = Visualizer(output_dir=args.output)
     
     try:
         # Load and analyze data
@@ -44,17 +48,19 @@ def main():
         # Find connections if requested
         if args.connections:
             print("\nAnalyzing connections...")
-            connections = analyzer.find_connections()
+            connections = analyzer.find_connections(method=args.method)
             print(f"Found {len(connections)} potential connections")
             
             # Visualize connections
             if args.visualize:
-                visualizer.plot_connections(connections, data, format=args.format)
+                visualizer.plot_connections(connections, data, format=args.format, analyzer=analyzer)
         
         # Generate basic visualizations if requested
         if args.visualize:
             print("\nGenerating visualizations...")
-            visualizer.create_basic_plots(data, format=args.format)
+            corr_matrix = analyzer.get_correlation_matrix() if len(analyzer.numeric_columns) > 1 else None
+            visualizer.create_basic_plots(data, analyzer.numeric_columns, analyzer.categorical_columns,
+                                          format=args.format, corr_matrix=corr_matrix)
             print(f"Visualizations saved to: {args.output}")
             
     except Exception as e:
@@ -0,0 +1,59 @@
+"""
+Tests for the correlation kernels in csv_analyzer
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from csv_analyzer import correlation_matrix
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_constant_on_common_rows_is_nan(seed):
+    """A column that only varies outside a pair's common rows has undefined correlation there"""
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(20, 400))
+    x = rng.normal(size=n) * 10 ** rng.uniform(-3, 6) + rng.normal() * 10 ** rng.uniform(0, 8)
+    y = rng.normal(size=n)
+    shared = rng.random(n) < 0.5
+    shared[:2] = True
+    x[shared] = x[shared][0]
+    y[~shared] = np.nan
+    arr = np.column_stack([x, y])
+
+    result = correlation_matrix(arr)
+    expected = pd.DataFrame(arr).corr().to_numpy()
+
+    assert np.isnan(result[0, 1]) and np.isnan(result[1, 0])
+    np.testing.assert_array_equal(np.isnan(result), np.isnan(expected))
+
+
+def test_pairwise_complete_matches_pandas():
+    rng = np.random.default_rng(0)
+    a = rng.normal(size=2000)
+    b = a + rng.normal(size=2000)
+    c = b + rng.normal(size=2000)
+    a[a > 0.8] = np.nan
+    b[c < -1] = np.nan
+    arr = np.column_stack([a, b, c, np.full(2000, 0.1), np.full(2000, 0.3)])
+
+    np.testing.assert_allclose(correlation_matrix(arr), pd.DataFrame(arr).corr().to_numpy(),
+                               atol=1e-12, equal_nan=True)
+
+
+def test_large_offset_columns_are_not_collapsed():
+    rng = np.random.default_rng(1)
+    arr = np.column_stack([1e8 + rng.normal(size=5000), 1e8 + rng.normal(size=5000)])
+
+    np.testing.assert_allclose(correlation_matrix(arr), np.corrcoef(arr, rowvar=False), atol=1e-6)
+
+
+@pytest.mark.parametrize('with_nan', [False, True])
+def test_result_is_float64(with_nan):
+    rng = np.random.default_rng(2)
+    arr = rng.normal(size=(100, 3))
+    if with_nan:
+        arr[0, 0] = np.nan
+
+    assert correlation_matrix(arr).dtype == np.float64
@@ -2,16 +2,17 @@
 Visualization module for creating charts and connection graphs
 """
 
+import matplotlib
+matplotlib.use('Agg')  # Headless backend; must be selected before pyplot is imported
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
 import seaborn as sns
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import networkx as nx
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
+from csv_analyzer import CSVAnalyzer, correlation_matrix
 
 class Visualizer:
     def __init__(self, output_dir: str = 'output'):
@@ -22,10 +23,15 @@ class Visualizer:
         plt.style.use('seaborn-v0_8')
         sns.set_palette("husl")
         
-    def create_basic_plots(self, data: pd.DataFrame, format: str = 'both'):
+    def create_basic_plots(self, data: pd.DataFrame, numeric_cols: List[str] = None,
+                           categorical_cols: List[str] = None, format: str = 'both',
+                           corr_matrix: np.ndarray = None):
         """Create basic visualization plots for the dataset"""
-        numeric_cols = data.select_dtypes(include=[np.number]).columns
-        categorical_cols = data.select_dtypes(include=['object']).columns
+        # Column types are only re-detected when the caller hasn't already done so
+        if numeric_cols is None:
+            numeric_cols = data.select_dtypes(include=[np.number]).columns.tolist()
+        if categorical_cols is None:
+            categorical_cols = data.select_dtypes(include=['object']).columns.tolist()
         
         # Distribution plots for numeric columns
         if len(numeric_cols) > 0:
@@ -37,7 +43,7 @@ class Visualizer:
         
         # Correlation heatmap
         if len(numeric_cols) > 1:
-            self._create_correlation_heatmap(data, numeric_cols, format)
+            self._create_correlation_heatmap(data, numeric_cols, format, corr_matrix)
         
         # Pairplot for numeric data (if not too many columns)
         if 2 <= len(numeric_cols) <= 6:
@@ -58,9 +64,18 @@ class Visualizer:
         else:
             axes = axes.flatten()
         
-        for i, col in enumerate(numeric_cols):
+        # np.histogram releases the GIL, so bin all columns concurrently; plotting stays serial
+        def histogram(col):
+            values = data[col].to_numpy(dtype=np.float64)
+            return np.histogram(values[~np.isnan(values)], bins=30)
+        
+        with ThreadPoolExecutor() as executor:
+            histograms = list(executor.map(histogram, numeric_cols))
+        
+        for i, (col, (counts, edges)) in enumerate(zip(numeric_cols, histograms)):
             if i < len(axes):
-                axes[i].hist(data[col].dropna(), bins=30, alpha=0.7, edgecolor='black')
+                axes[i].bar(edges[:-1], counts, width=np.diff(edges), align='edge',
+                           alpha=0.7, edgecolor='black')
                 axes[i].set_title(f'Distribution of {col}')
                 axes[i].set_xlabel(col)
                 axes[i].set_ylabel('Frequency')
@@ -72,10 +87,13 @@ class Visualizer:
         plt.tight_layout()
         
         if format in ['png', 'both']:
-            plt.savefig(self.output_dir / 'distributions.png', dpi=300, bbox_inches='tight')
+            plt.savefig(self.output_dir / 'distributions.png', dpi=150)
         
         if format in ['html', 'both']:
-            # Create interactive plotly version
+            # Create interactive plotly version (plotly is imported lazily; it is slow to load)
+            import plotly.graph_objects as go
+            from plotly.subplots import make_subplots
+            
             fig_plotly = make_subplots(
                 rows=n_rows, cols=3,
                 subplot_titles=[f'Distribution of {col}' for col in numeric_cols]
@@ -107,13 +125,24 @@ class Visualizer:
         
         for i, col in enumerate(categorical_cols):
             if i < len(axes):
-                value_counts = data[col].value_counts().head(10)  # Top 10 categories
-                axes[i].bar(range(len(value_counts)), value_counts.values)
+                # Top 10 categories: factorize + bincount, then select rather than sorting all counts
+                codes, uniques = pd.factorize(data[col])
+                counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+                top = np.arange(counts.size)
+                if counts.size > 10:
+                    # Keep everything tied with the 10th-largest count so the cut below is deterministic
+                    kth = np.partition(counts, counts.size - 10)[counts.size - 10]
+                    top = np.flatnonzero(counts >= kth)
+                # Highest count first, ties in order of first appearance (as value_counts does)
+                top = top[np.lexsort((top, -counts[top]))][:10]
+                values, counts = uniques[top], counts[top]
+                
+                axes[i].bar(range(len(counts)), counts)
                 axes[i].set_title(f'Top Categories in {col}')
                 axes[i].set_xlabel('Categories')
                 axes[i].set_ylabel('Count')
-                axes[i].set_xticks(range(len(value_counts)))
-                axes[i].set_xticklabels(value_counts.index, rotation=45, ha='right')
+                axes[i].set_xticks(range(len(counts)))
+                axes[i].set_xticklabels(values, rotation=45, ha='right')
         
         # Hide empty subplots
         for i in range(len(categorical_cols), len(axes)):
@@ -122,13 +151,16 @@ class Visualizer:
         plt.tight_layout()
         
         if format in ['png', 'both']:
-            plt.savefig(self.output_dir / 'categorical.png', dpi=300, bbox_inches='tight')
+            plt.savefig(self.output_dir / 'categorical.png', dpi=150)
         
         plt.close()
     
-    def _create_correlation_heatmap(self, data: pd.DataFrame, numeric_cols: pd.Index, format: str):
-        """Create correlation heatmap"""
-        corr_matrix = data[numeric_cols].corr()
+    def _create_correlation_heatmap(self, data: pd.DataFrame, numeric_cols: pd.Index, format: str,
+                                   corr_matrix: np.ndarray = None):
+        """Create correlation heatmap, reusing a precomputed matrix when one is given"""
+        if corr_matrix is None:
+            corr_matrix = correlation_matrix(data[numeric_cols].to_numpy(dtype=np.float64))
+        corr_matrix = pd.DataFrame(corr_matrix, index=numeric_cols, columns=numeric_cols)
         
         plt.figure(figsize=(10, 8))
         sns.heatmap(corr_matrix, annot=True, cmap='coolwarm', center=0,
@@ -137,9 +169,11 @@ class Visualizer:
         plt.tight_layout()
         
         if format in ['png', 'both']:
-            plt.savefig(self.output_dir / 'correlation_heatmap.png', dpi=300, bbox_inches='tight')
+            plt.savefig(self.output_dir / 'correlation_heatmap.png', dpi=150)
         
         if format in ['html', 'both']:
+            import plotly.express as px
+            
             fig_plotly = px.imshow(corr_matrix, text_auto=True, aspect="auto",
                                  title="Correlation Heatmap")
             fig_plotly.write_html(self.output_dir / 'correlation_heatmap.html')
@@ -149,13 +183,30 @@ class Visualizer:
     def _create_pairplot(self, data: pd.DataFrame, numeric_cols: pd.Index, format: str):
         """Create pairplot for numeric columns"""
         if format in ['png', 'both']:
-            pairplot = sns.pairplot(data[numeric_cols].dropna())
-            pairplot.fig.suptitle('Pairwise Relationships', y=1.02)
-            plt.savefig(self.output_dir / 'pairplot.png', dpi=300, bbox_inches='tight')
+            # Build the scatter grid directly from one array extraction
+            matrix = data[numeric_cols].dropna().to_numpy(dtype=np.float64)
+            k = matrix.shape[1]
+            
+            fig, axes = plt.subplots(k, k, figsize=(2.5 * k, 2.5 * k), squeeze=False)
+            for i in range(k):
+                for j in range(k):
+                    if i == j:
+                        axes[i, j].hist(matrix[:, i], bins=30, alpha=0.7)
+                    else:
+                        axes[i, j].scatter(matrix[:, j], matrix[:, i], s=3, alpha=0.4, rasterized=True)
+                    if i == k - 1:
+                        axes[i, j].set_xlabel(numeric_cols[j])
+                    if j == 0:
+                        axes[i, j].set_ylabel(numeric_cols[i])
+            
+            fig.suptitle('Pairwise Relationships')
+            plt.tight_layout()
+            plt.savefig(self.output_dir / 'pairplot.png', dpi=150)
             plt.close()
     
-    def plot_connections(self, connections: List[Dict[str, Any]], data: pd.DataFrame, format: str = 'both'):
-        """Visualize connections found in the data"""
+    def plot_connections(self, connections: List[Dict[str, Any]], data: pd.DataFrame, format: str = 'both',
+                         analyzer: CSVAnalyzer = None):
+        """Visualize connections found in the data, reusing the analyzer's cached arrays when given"""
         if not connections:
             print("No connections to visualize")
             return
@@ -164,10 +215,12 @@ class Visualizer:
         self._create_connection_network(connections, format)
         
         # Create detailed plots for strongest connections
-        self._create_connection_details(connections[:5], data, format)  # Top 5 connections
+        self._create_connection_details(connections[:5], data, format, analyzer)  # Top 5 connections
     
     def _create_connection_network(self, connections: List[Dict[str, Any]], format: str):
         """Create network graph showing connections between variables"""
+        import networkx as nx
+        
         G = nx.Graph()
         
         # Add nodes and edges
@@ -183,7 +236,11 @@ class Visualizer:
                           type=conn['type'])
         
         plt.figure(figsize=(12, 8))
-        pos = nx.spring_layout(G, k=1, iterations=50)
+        # Force-directed layout is O(V^2) per iteration; large graphs get a deterministic circle
+        if G.number_of_nodes() > 50:
+            pos = nx.circular_layout(G)
+        else:
+            pos = nx.spring_layout(G, k=1, iterations=50)
         
         # Draw nodes
         nx.draw_networkx_nodes(G, pos, node_color='lightblue', 
@@ -193,12 +250,15 @@ class Visualizer:
         correlation_edges = [(u, v) for u, v, d in G.edges(data=True) if d['type'] == 'correlation']
         influence_edges = [(u, v) for u, v, d in G.edges(data=True) if d['type'] == 'categorical_influence']
         
+        # One LineCollection artist per connection type rather than one artist per edge
+        ax = plt.gca()
         if correlation_edges:
-            nx.draw_networkx_edges(G, pos, edgelist=correlation_edges, 
-                                 edge_color='red', alpha=0.6, width=2)
+            segments = [(pos[u], pos[v]) for u, v in correlation_edges]
+            ax.add_collection(LineCollection(segments, colors='red', alpha=0.6, linewidths=2, zorder=0))
         if influence_edges:
-            nx.draw_networkx_edges(G, pos, edgelist=influence_edges,
-                                 edge_color='blue', alpha=0.6, width=2, style='dashed')
+            segments = [(pos[u], pos[v]) for u, v in influence_edges]
+            ax.add_collection(LineCollection(segments, colors='blue', alpha=0.6, linewidths=2,
+                                             linestyles='dashed', zorder=0))
         
         # Draw labels
         nx.draw_networkx_labels(G, pos, font_size=10, font_weight='bold')
@@ -217,13 +277,15 @@ class Visualizer:
         if legend_elements:
             plt.legend(handles=legend_elements)
         
+        plt.tight_layout()
+        
         if format in ['png', 'both']:
-            plt.savefig(self.output_dir / 'connection_network.png', dpi=300, bbox_inches='tight')
+            plt.savefig(self.output_dir / 'connection_network.png', dpi=150)
         
         plt.close()
     
     def _create_connection_details(self, top_connections: List[Dict[str, Any]], 
-                                 data: pd.DataFrame, format: str):
+                                 data: pd.DataFrame, format: str, analyzer: CSVAnalyzer = None):
         """Create detailed plots for the strongest connections"""
         n_connections = len(top_connections)
         if n_connections == 0:
@@ -236,24 +298,32 @@ class Visualizer:
         for i, conn in enumerate(top_connections):
             if conn['type'] == 'correlation':
                 # Scatter plot for correlations
-                x_data = data[conn['column1']].dropna()
-                y_data = data[conn['column2']].dropna()
+                if analyzer is not None:
+                    # Combine the analyzer's precomputed NaN masks instead of re-scanning the columns
+                    x_data, y_data = analyzer.get_column_pair(conn['column1'], conn['column2'])
+                else:
+                    # Drop rows where either column is NaN in a single pass
+                    sub = data[[conn['column1'], conn['column2']]].dropna()
+                    x_data = sub[conn['column1']].to_numpy()
+                    y_data = sub[conn['column2']].to_numpy()
                 
-                # Align the data (remove rows where either is NaN)
-                common_idx = x_data.index.intersection(y_data.index)
-                x_data = x_data[common_idx]
-                y_data = y_data[common_idx]
+                # Plot a fixed-size sample; the trend line below still uses every point
+                x_plot, y_plot = x_data, y_data
+                if x_data.size > 10000:
+                    idx = np.random.default_rng(0).choice(x_data.size, 10000, replace=False)
+                    x_plot, y_plot = x_data[idx], y_data[idx]
                 
-                axes[i].scatter(x_data, y_data, alpha=0.6)
+                axes[i].scatter(x_plot, y_plot, s=4, alpha=0.6, rasterized=True)
                 axes[i].set_xlabel(conn['column1'])
                 axes[i].set_ylabel(conn['column2'])
                 axes[i].set_title(f"Correlation: {conn['column1']} vs {conn['column2']} "
                                 f"(r = {conn['value']:.3f})")
                 
-                # Add trend line
+                # Add trend line (a straight line only needs its two endpoints)
                 z = np.polyfit(x_data, y_data, 1)
                 p = np.poly1d(z)
-                axes[i].plot(x_data, p(x_data), "r--", alpha=0.8)
+                x_ends = np.array([x_data.min(), x_data.max()])
+                axes[i].plot(x_ends, p(x_ends), "r--", alpha=0.8)
                 
             elif conn['type'] == 'categorical_influence':
                 # Box plot for categorical influence
@@ -264,6 +334,6 @@ class Visualizer:
         plt.tight_layout()
         
         if format in ['png', 'both']:
-            plt.savefig(self.output_dir / 'connection_details.png', dpi=300, bbox_inches='tight')
+            plt.savefig(self.output_dir / 'connection_details.png', dpi=150)
         
         plt.close()
\ No newline at end of file